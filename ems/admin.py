@@ -3,6 +3,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
     User,
     AttendanceRecord,
+    AttendanceMonthlySummary,
     LeaveRequest,
     Task,
     SalaryRecord,
@@ -20,6 +21,7 @@ class UserAdmin(BaseUserAdmin):
 
 
 admin.site.register(AttendanceRecord)
+admin.site.register(AttendanceMonthlySummary)
 admin.site.register(LeaveRequest)
 admin.site.register(Task)
 admin.site.register(SalaryRecord)
@@ -1,24 +1,12 @@
 from datetime import date
-from django.db.models import Q
+from functools import lru_cache
+from django.db.models import Exists, OuterRef, Sum
 from decimal import Decimal
-from .models import AttendanceRecord, LeaveRequest, User
+from .models import AttendanceMonthlySummary, LeaveRequest, User
+from .money import from_cents, to_cents
 
 
-def attendance_flag(employee, month=None):
-    records = AttendanceRecord.objects.filter(
-        employee=employee, review_status=AttendanceRecord.REVIEW_APPROVED
-    )
-    if month:
-        month_start = month.replace(day=1)
-        if month.month == 12:
-            month_end = month.replace(year=month.year + 1, month=1, day=1)
-        else:
-            month_end = month.replace(month=month.month + 1, day=1)
-        records = records.filter(date__gte=month_start, date__lt=month_end)
-
-    late_count = records.filter(status=AttendanceRecord.STATUS_LATE).count()
-    absent_count = records.filter(status=AttendanceRecord.STATUS_ABSENT).count()
-
+def _flag_from_counts(late_count, absent_count):
     if late_count > 4:
         return 'Frequently Late'
     if absent_count >= 3 and late_count >= 3:
@@ -26,19 +14,63 @@ def attendance_flag(employee, month=None):
     return 'Stable Attendance'
 
 
+def _attendance_summaries(month=None):
+    summaries = AttendanceMonthlySummary.objects.all()
+    if month:
+        summaries = summaries.filter(month=month.replace(day=1))
+    return summaries
+
+
+def _summary_totals():
+    return {'late': Sum('late_days'), 'absent': Sum('absent_days')}
+
+
+def attendance_flag(employee, month=None, cache=None):
+    key = (employee.id, month and month.replace(day=1))
+    if cache is not None and key in cache:
+        return cache[key]
+    counts = _attendance_summaries(month).filter(employee=employee).aggregate(**_summary_totals())
+    flag = _flag_from_counts(counts['late'] or 0, counts['absent'] or 0)
+    if cache is not None:
+        cache[key] = flag
+    return flag
+
+
+def attendance_flags(employees, month=None, cache=None):
+    employee_ids = [employee.id for employee in employees]
+    rows = (
+        _attendance_summaries(month)
+        .filter(employee_id__in=employee_ids)
+        .order_by()
+        .values('employee_id')
+        .annotate(**_summary_totals())
+    )
+    counts = {row['employee_id']: (row['late'], row['absent']) for row in rows}
+    flags = {
+        employee_id: _flag_from_counts(*counts.get(employee_id, (0, 0)))
+        for employee_id in employee_ids
+    }
+    if cache is not None:
+        month_key = month and month.replace(day=1)
+        cache.update({(employee_id, month_key): flag for employee_id, flag in flags.items()})
+    return flags
+
+
 def _team_available(employee, start_date, end_date):
     if not employee.department:
         return True
-    team_members = User.objects.filter(department=employee.department).exclude(id=employee.id)
-    if not team_members.exists():
-        return True
-
-    overlapping = LeaveRequest.objects.filter(
-        employee__in=team_members,
+    teammates = User.objects.filter(department=employee.department).exclude(id=employee.id)
+    on_leave = LeaveRequest.objects.filter(
+        employee=OuterRef('pk'),
         status=LeaveRequest.STATUS_APPROVED,
-    ).filter(Q(start_date__lte=end_date) & Q(end_date__gte=start_date))
-
-    return team_members.count() - overlapping.values('employee').distinct().count() >= 1
+        start_date__lte=end_date,
+        end_date__gte=start_date,
+    )
+    team = User.objects.filter(pk=employee.pk).values(
+        has_team=Exists(teammates),
+        has_free=Exists(teammates.exclude(Exists(on_leave))),
+    ).get()
+    return not team['has_team'] or team['has_free']
 
 
 def leave_recommendation(leave_request):
@@ -50,42 +82,57 @@ def leave_recommendation(leave_request):
 
 
 def payslip_summary(salary_record):
-    base = salary_record.base_salary or Decimal('0.00')
-    final = salary_record.final_salary or Decimal('0.00')
-    deduction = max(base - final, Decimal('0.00'))
-    deduction_rate = (deduction / base * Decimal('100')) if base else Decimal('0.00')
+    summary = _payslip_summary(
+        salary_record.base_salary,
+        salary_record.final_salary,
+        salary_record.absent_days,
+        salary_record.late_days,
+        salary_record.anomaly_flag,
+    )
+    return {**summary, 'insights': list(summary['insights']), 'warnings': list(summary['warnings'])}
+
+
+# Keyed on the persisted fields the summary reads, so an edited record never hits a stale entry.
+@lru_cache(maxsize=2048)
+def _payslip_summary(base_salary, final_salary, absent_days, late_days, anomaly_flag):
+    base_cents = to_cents(base_salary)
+    deduction_cents = max(base_cents - to_cents(final_salary), 0)
+    deduction = from_cents(deduction_cents)
+    deduction_rate = (
+        Decimal(deduction_cents * 100) / Decimal(base_cents) if base_cents else Decimal('0.00')
+    )
 
     insights = []
     warnings = []
 
-    if deduction == 0:
+    if deduction_cents == 0:
         headline = 'Full payout expected for this month.'
         insights.append('No attendance deductions were applied.')
-    elif deduction_rate >= Decimal('20'):
+    elif 5 * deduction_cents >= base_cents:
         headline = 'Significant deductions detected this month.'
     else:
         headline = 'Minor deductions applied to this month.'
 
-    if salary_record.absent_days:
-        insights.append(f'{salary_record.absent_days} day(s) marked absent.')
-    if salary_record.late_days:
-        insights.append(f'{salary_record.late_days} day(s) marked late.')
+    if absent_days:
+        insights.append(f'{absent_days} day(s) marked absent.')
+    if late_days:
+        insights.append(f'{late_days} day(s) marked late.')
 
     if not insights:
         insights.append('Attendance signals are stable for this period.')
 
-    if salary_record.anomaly_flag:
+    if anomaly_flag:
         warnings.append('Salary changed by more than 30% compared to last month.')
 
-    if deduction > 0:
+    if deduction_cents > 0:
         warnings.append(
             f'Deduction total: {deduction:.2f} ({deduction_rate:.1f}% of base pay).'
         )
 
     return {
         'headline': headline,
-        'insights': insights,
-        'warnings': warnings,
+        'insights': tuple(insights),
+        'warnings': tuple(warnings),
         'deduction': deduction,
         'deduction_rate': deduction_rate,
     }
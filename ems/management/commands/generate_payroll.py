@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ems.models import SalaryRecord
+
+
+class Command(BaseCommand):
+    help = "Create salary records for a month, carrying over each employee's latest base salary."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'month', nargs='?', help='Month to generate, as YYYY-MM (default: current month).'
+        )
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                year, month = (int(part) for part in options['month'].split('-'))
+                month = date(year, month, 1)
+            except ValueError:
+                raise CommandError('Month must be given as YYYY-MM.')
+        else:
+            month = date.today().replace(day=1)
+
+        records = SalaryRecord.generate_month(month)
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {len(records)} salary record(s) for {month:%Y-%m}.')
+        )
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.14 on 2026-10-15 07:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    AttendanceRecord = apps.get_model('ems', 'AttendanceRecord')
+    AttendanceMonthlySummary = apps.get_model('ems', 'AttendanceMonthlySummary')
+
+    totals = {}
+    records = AttendanceRecord.objects.filter(review_status='APPROVED').values_list(
+        'employee_id', 'date', 'status'
+    )
+    for employee_id, day, status in records.iterator():
+        counts = totals.setdefault(
+            (employee_id, day.replace(day=1)), {'present_days': 0, 'late_days': 0, 'absent_days': 0}
+        )
+        counts[f'{status.lower()}_days'] += 1
+
+    AttendanceMonthlySummary.objects.bulk_create(
+        [
+            AttendanceMonthlySummary(employee_id=employee_id, month=month, **counts)
+            for (employee_id, month), counts in totals.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ems', '0002_attendancerecord_review_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('present_days', models.IntegerField(default=0)),
+                ('late_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancemonthlysummary',
+            constraint=models.UniqueConstraint(fields=('employee', 'month'), name='unique_attendance_summary_month'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
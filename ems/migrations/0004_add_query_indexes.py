@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-15 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ems', '0003_attendancemonthlysummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['status', 'start_date', 'end_date'], name='leave_status_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['employee', '-created_at'], name='leave_employee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salaryrecord',
+            index=models.Index(condition=models.Q(('anomaly_flag', True)), fields=['anomaly_flag'], name='salary_anomaly_idx'),
+        ),
+    ]
@@ -1,9 +1,19 @@
+from datetime import date
 from decimal import Decimal
-import calendar
+from functools import lru_cache
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
 
+from .money import from_cents, to_cents
+
+
+@lru_cache(maxsize=1024)
+def _month_bounds(year, month):
+    start = date(year, month, 1)
+    end = date(year + (month == 12), month % 12 + 1, 1)
+    return start, end
+
 
 class User(AbstractUser):
     ROLE_HR = 'HR'
@@ -72,6 +82,52 @@ class AttendanceRecord(models.Model):
     def __str__(self):
         return f"{self.employee.username} {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so the summary signal can refresh the month a record moved out of.
+        instance._saved_attendance = (
+            instance.__dict__.get('employee_id'),
+            instance.__dict__.get('date'),
+        )
+        return instance
+
+
+class AttendanceMonthlySummary(models.Model):
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_summaries')
+    month = models.DateField()
+    present_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-month']
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'month'], name='unique_attendance_summary_month')
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} {self.month}"
+
+    @classmethod
+    def refresh(cls, employee_id, month, create=True):
+        month_start, next_month = _month_bounds(month.year, month.month)
+
+        counts = AttendanceRecord.objects.filter(
+            employee_id=employee_id,
+            date__gte=month_start,
+            date__lt=next_month,
+            review_status=AttendanceRecord.REVIEW_APPROVED,
+        ).aggregate(
+            present_days=models.Count('id', filter=models.Q(status=AttendanceRecord.STATUS_PRESENT)),
+            late_days=models.Count('id', filter=models.Q(status=AttendanceRecord.STATUS_LATE)),
+            absent_days=models.Count('id', filter=models.Q(status=AttendanceRecord.STATUS_ABSENT)),
+        )
+        if create:
+            cls.objects.update_or_create(employee_id=employee_id, month=month_start, defaults=counts)
+        else:
+            cls.objects.filter(employee_id=employee_id, month=month_start).update(**counts)
+
 
 class LeaveRequest(models.Model):
     STATUS_PENDING = 'PENDING'
@@ -97,6 +153,10 @@ class LeaveRequest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'start_date', 'end_date'], name='leave_status_dates_idx'),
+            models.Index(fields=['employee', '-created_at'], name='leave_employee_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee.username} {self.start_date}"
@@ -147,6 +207,13 @@ class SalaryRecord(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['employee', 'month'], name='unique_salary_month')
         ]
+        indexes = [
+            models.Index(
+                fields=['anomaly_flag'],
+                name='salary_anomaly_idx',
+                condition=models.Q(anomaly_flag=True),
+            )
+        ]
 
     def __str__(self):
         return f"{self.employee.username} {self.month}"
@@ -154,33 +221,60 @@ class SalaryRecord(models.Model):
     def save(self, *args, **kwargs):
         if self.month:
             self.month = self.month.replace(day=1)
-        month_start = self.month
-        last_day = calendar.monthrange(self.month.year, self.month.month)[1]
-        month_end = self.month.replace(day=last_day)
+        counts = AttendanceMonthlySummary.objects.filter(
+            employee=self.employee, month=self.month
+        ).values_list('late_days', 'absent_days').first()
+        self.late_days, self.absent_days = counts or (0, 0)
 
-        attendance = AttendanceRecord.objects.filter(
-            employee=self.employee,
-            date__range=(month_start, month_end),
-            review_status=AttendanceRecord.REVIEW_APPROVED,
-        )
-        self.late_days = attendance.filter(status=AttendanceRecord.STATUS_LATE).count()
-        self.absent_days = attendance.filter(status=AttendanceRecord.STATUS_ABSENT).count()
+        previous_final_salary = SalaryRecord.objects.filter(
+            employee=self.employee, month__lt=self.month
+        ).order_by('-month').values_list('final_salary', flat=True).first()
+        self._compute(previous_final_salary)
+
+        super().save(*args, **kwargs)
 
-        daily_rate = (self.base_salary / Decimal('22')) if self.base_salary else Decimal('0.00')
-        deduction = (daily_rate * Decimal(self.absent_days)) + (daily_rate / Decimal('2')) * Decimal(self.late_days)
-        self.final_salary = max(self.base_salary - deduction, Decimal('0.00'))
+    def _compute(self, previous_final_salary):
+        base_cents = to_cents(self.base_salary)
+        # An absent day costs 1/22 of base pay and a late day half that, so sum in 44ths.
+        deduction_cents = (base_cents * (2 * self.absent_days + self.late_days) + 22) // 44
+        final_cents = max(base_cents - deduction_cents, 0)
+        self.final_salary = from_cents(final_cents)
 
-        previous = SalaryRecord.objects.filter(
-            employee=self.employee, month__lt=self.month
-        ).order_by('-month').first()
-        if previous and previous.final_salary:
-            diff = abs(self.final_salary - previous.final_salary)
-            ratio = diff / previous.final_salary if previous.final_salary else Decimal('0.00')
-            self.anomaly_flag = ratio > Decimal('0.30')
+        previous_cents = to_cents(previous_final_salary)
+        if previous_cents:
+            self.anomaly_flag = 10 * abs(final_cents - previous_cents) > 3 * previous_cents
         else:
             self.anomaly_flag = False
 
-        super().save(*args, **kwargs)
+    @classmethod
+    def generate_month(cls, month):
+        # Carries over each employee's latest base salary; employees without an
+        # earlier record, or already paid for this month, are skipped.
+        month = month.replace(day=1)
+        previous = cls.objects.filter(employee=models.OuterRef('pk'), month__lt=month).order_by('-month')
+        employees = (
+            User.objects.annotate(
+                previous_base=models.Subquery(previous.values('base_salary')[:1]),
+                previous_final=models.Subquery(previous.values('final_salary')[:1]),
+            )
+            .filter(previous_base__isnull=False)
+            .exclude(salary_records__month=month)
+            .values_list('id', 'previous_base', 'previous_final')
+        )
+        attendance = {
+            employee_id: (late_days, absent_days)
+            for employee_id, late_days, absent_days in AttendanceMonthlySummary.objects.filter(
+                month=month
+            ).values_list('employee_id', 'late_days', 'absent_days')
+        }
+
+        records = []
+        for employee_id, base_salary, previous_final in employees:
+            record = cls(employee_id=employee_id, month=month, base_salary=base_salary)
+            record.late_days, record.absent_days = attendance.get(employee_id, (0, 0))
+            record._compute(previous_final)
+            records.append(record)
+        return cls.objects.bulk_create(records, batch_size=500)
 
 
 class PerformanceRating(models.Model):
@@ -0,0 +1,13 @@
+from decimal import Decimal
+
+CENT = Decimal('0.01')
+
+
+def to_cents(amount):
+    if not amount:
+        return 0
+    return int(Decimal(amount).quantize(CENT) * 100)
+
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AttendanceMonthlySummary, AttendanceRecord, User
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def refresh_attendance_summary(sender, instance, **kwargs):
+    AttendanceMonthlySummary.refresh(instance.employee_id, instance.date)
+    previous_employee_id, previous_date = getattr(instance, '_saved_attendance', (None, None))
+    instance._saved_attendance = (instance.employee_id, instance.date)
+    if previous_employee_id is None or previous_date is None:
+        return
+    moved_employee = previous_employee_id != instance.employee_id
+    moved_month = previous_date.replace(day=1) != instance.date.replace(day=1)
+    if moved_employee or moved_month:
+        AttendanceMonthlySummary.refresh(previous_employee_id, previous_date, create=False)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def clear_attendance_summary(sender, instance, origin=None, **kwargs):
+    # Deleting the employee cascades to their summaries too, so there is nothing to refresh.
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    AttendanceMonthlySummary.refresh(instance.employee_id, instance.date, create=False)
@@ -0,0 +1,254 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .ai import _flag_from_counts, attendance_flag, attendance_flags
+from .models import AttendanceMonthlySummary, AttendanceRecord, SalaryRecord, User
+
+
+JANUARY = date(2026, 1, 1)
+FEBRUARY = date(2026, 2, 1)
+
+
+class AttendanceSummaryTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='x')
+        self.bob = User.objects.create_user('bob', password='x')
+
+    def mark(self, employee, day, status, review_status=AttendanceRecord.REVIEW_APPROVED):
+        return AttendanceRecord.objects.create(
+            employee=employee, date=day, status=status, review_status=review_status
+        )
+
+    def summary(self, employee, month):
+        return (
+            AttendanceMonthlySummary.objects.filter(employee=employee, month=month)
+            .values_list('present_days', 'late_days', 'absent_days')
+            .first()
+        )
+
+    def direct_counts(self, employee, month):
+        records = AttendanceRecord.objects.filter(
+            employee=employee,
+            date__year=month.year,
+            date__month=month.month,
+            review_status=AttendanceRecord.REVIEW_APPROVED,
+        )
+        return tuple(
+            records.filter(status=status).count()
+            for status in (
+                AttendanceRecord.STATUS_PRESENT,
+                AttendanceRecord.STATUS_LATE,
+                AttendanceRecord.STATUS_ABSENT,
+            )
+        )
+
+    def test_pending_records_are_not_counted(self):
+        self.mark(
+            self.alice, JANUARY, AttendanceRecord.STATUS_LATE, AttendanceRecord.REVIEW_PENDING
+        )
+        self.assertEqual(self.summary(self.alice, JANUARY), (0, 0, 0))
+
+    def test_approve_and_reject_refresh_summary(self):
+        record = self.mark(
+            self.alice, JANUARY, AttendanceRecord.STATUS_LATE, AttendanceRecord.REVIEW_PENDING
+        )
+        record = AttendanceRecord.objects.get(pk=record.pk)
+
+        record.review_status = AttendanceRecord.REVIEW_APPROVED
+        record.save()
+        self.assertEqual(self.summary(self.alice, JANUARY), (0, 1, 0))
+
+        record.review_status = AttendanceRecord.REVIEW_REJECTED
+        record.save()
+        self.assertEqual(self.summary(self.alice, JANUARY), (0, 0, 0))
+
+    def test_moving_record_to_another_month_refreshes_both(self):
+        record = self.mark(self.alice, JANUARY, AttendanceRecord.STATUS_ABSENT)
+        record = AttendanceRecord.objects.get(pk=record.pk)
+
+        record.date = FEBRUARY
+        record.save()
+
+        self.assertEqual(self.summary(self.alice, JANUARY), (0, 0, 0))
+        self.assertEqual(self.summary(self.alice, FEBRUARY), (0, 0, 1))
+
+    def test_moving_record_to_another_employee_refreshes_both(self):
+        record = self.mark(self.alice, JANUARY, AttendanceRecord.STATUS_LATE)
+        record = AttendanceRecord.objects.get(pk=record.pk)
+
+        record.employee = self.bob
+        record.save()
+
+        self.assertEqual(self.summary(self.alice, JANUARY), (0, 0, 0))
+        self.assertEqual(self.summary(self.bob, JANUARY), (0, 1, 0))
+
+    def test_saving_loaded_record_does_not_reread_it(self):
+        record = self.mark(self.alice, JANUARY, AttendanceRecord.STATUS_LATE)
+        record = AttendanceRecord.objects.get(pk=record.pk)
+        record.status = AttendanceRecord.STATUS_PRESENT
+
+        with CaptureQueriesContext(connection) as queries:
+            record.save()
+
+        reads = [
+            query['sql']
+            for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and '"ems_attendancerecord"."id" =' in query['sql']
+        ]
+        self.assertEqual(reads, [])
+        self.assertEqual(self.summary(self.alice, JANUARY), (1, 0, 0))
+
+    def test_delete_refreshes_summary(self):
+        record = self.mark(self.alice, JANUARY, AttendanceRecord.STATUS_LATE)
+        self.mark(self.alice, JANUARY + timedelta(days=1), AttendanceRecord.STATUS_ABSENT)
+
+        record.delete()
+
+        self.assertEqual(self.summary(self.alice, JANUARY), (0, 0, 1))
+
+    def test_employee_delete_does_not_refresh_per_record(self):
+        AttendanceRecord.objects.bulk_create(
+            [
+                AttendanceRecord(
+                    employee=self.alice,
+                    date=JANUARY + timedelta(days=offset),
+                    status=AttendanceRecord.STATUS_LATE,
+                    review_status=AttendanceRecord.REVIEW_APPROVED,
+                )
+                for offset in range(300)
+            ]
+        )
+        AttendanceMonthlySummary.refresh(self.alice.id, JANUARY)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.alice.delete()
+
+        self.assertLess(len(queries), 30)
+        summaries = AttendanceMonthlySummary.objects.filter(employee_id=self.alice.id)
+        self.assertFalse(summaries.exists())
+
+    def test_backfill_matches_signal_maintained_summaries(self):
+        for offset, status in enumerate(['PRESENT', 'LATE', 'ABSENT', 'LATE']):
+            self.mark(self.alice, JANUARY + timedelta(days=offset), status)
+            self.mark(self.bob, FEBRUARY + timedelta(days=offset), status)
+        self.mark(self.bob, JANUARY, 'ABSENT', AttendanceRecord.REVIEW_PENDING)
+        fields = ('employee_id', 'month', 'present_days', 'late_days', 'absent_days')
+        expected = sorted(AttendanceMonthlySummary.objects.values_list(*fields))
+
+        AttendanceMonthlySummary.objects.all().delete()
+        migration = import_module('ems.migrations.0003_attendancemonthlysummary')
+        migration.backfill_summaries(apps, None)
+
+        backfilled = sorted(
+            row for row in AttendanceMonthlySummary.objects.values_list(*fields) if any(row[2:])
+        )
+        self.assertEqual(backfilled, sorted(row for row in expected if any(row[2:])))
+
+    def test_flags_and_salary_match_direct_counts(self):
+        for offset in range(5):
+            self.mark(self.alice, JANUARY + timedelta(days=offset), AttendanceRecord.STATUS_LATE)
+        for offset in range(3):
+            self.mark(self.bob, JANUARY + timedelta(days=offset), AttendanceRecord.STATUS_LATE)
+            self.mark(self.bob, JANUARY + timedelta(days=10 + offset), 'ABSENT')
+        self.mark(self.bob, FEBRUARY, AttendanceRecord.STATUS_ABSENT)
+
+        employees = [self.alice, self.bob]
+        flags = attendance_flags(employees, JANUARY)
+        for employee in employees:
+            _, late, absent = self.direct_counts(employee, JANUARY)
+            self.assertEqual(attendance_flag(employee, JANUARY), _flag_from_counts(late, absent))
+            self.assertEqual(flags[employee.id], _flag_from_counts(late, absent))
+
+            salary = SalaryRecord(employee=employee, month=JANUARY, base_salary=Decimal('2200'))
+            salary.save()
+            self.assertEqual((salary.late_days, salary.absent_days), (late, absent))
+
+        self.assertEqual(attendance_flag(self.alice, JANUARY), 'Frequently Late')
+        self.assertEqual(attendance_flag(self.bob, JANUARY), 'Irregular Attendance')
+        self.assertEqual(
+            SalaryRecord.objects.get(employee=self.bob, month=JANUARY).final_salary,
+            Decimal('1750.00'),
+        )
+
+
+class GenerateMonthTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='x')
+        self.bob = User.objects.create_user('bob', password='x')
+        self.carol = User.objects.create_user('carol', password='x')
+
+    def pay(self, employee, month, base):
+        SalaryRecord.objects.create(employee=employee, month=month, base_salary=Decimal(base))
+
+    def base_salary(self, employee, month):
+        return SalaryRecord.objects.get(employee=employee, month=month).base_salary
+
+    def test_carries_over_latest_base_salary(self):
+        self.pay(self.alice, date(2025, 11, 1), '1000')
+        self.pay(self.alice, date(2025, 12, 1), '3000')
+
+        records = SalaryRecord.generate_month(date(2026, 1, 15))
+
+        self.assertEqual([(r.employee_id, r.month) for r in records], [(self.alice.id, JANUARY)])
+        self.assertEqual(self.base_salary(self.alice, JANUARY), Decimal('3000'))
+
+    def test_skips_employees_without_history_or_already_paid(self):
+        self.pay(self.alice, date(2025, 12, 1), '3000')
+        self.pay(self.bob, date(2025, 12, 1), '2000')
+        self.pay(self.bob, JANUARY, '2500')
+
+        records = SalaryRecord.generate_month(JANUARY)
+
+        self.assertEqual([record.employee_id for record in records], [self.alice.id])
+        self.assertFalse(SalaryRecord.objects.filter(employee=self.carol).exists())
+        self.assertEqual(self.base_salary(self.bob, JANUARY), Decimal('2500'))
+        self.assertEqual(SalaryRecord.generate_month(JANUARY), [])
+
+    def test_matches_save_for_same_inputs(self):
+        self.pay(self.alice, date(2025, 12, 1), '2200')
+        self.pay(self.bob, date(2025, 12, 1), '5000')
+        statuses = [AttendanceRecord.STATUS_LATE] * 3 + [AttendanceRecord.STATUS_ABSENT] * 6
+        for offset, status in enumerate(statuses):
+            AttendanceRecord.objects.create(
+                employee=self.bob,
+                date=JANUARY + timedelta(days=offset),
+                status=status,
+                review_status=AttendanceRecord.REVIEW_APPROVED,
+            )
+        fields = (
+            'employee_id', 'base_salary', 'final_salary', 'late_days', 'absent_days', 'anomaly_flag'
+        )
+        january = SalaryRecord.objects.filter(month=JANUARY)
+
+        SalaryRecord.generate_month(JANUARY)
+        generated = sorted(january.values_list(*fields))
+
+        january.delete()
+        for employee_id, base_salary, *_ in generated:
+            SalaryRecord(employee_id=employee_id, month=JANUARY, base_salary=base_salary).save()
+        saved = sorted(january.values_list(*fields))
+
+        self.assertEqual(generated, saved)
+        bob = january.get(employee=self.bob)
+        self.assertEqual((bob.late_days, bob.absent_days), (3, 6))
+        self.assertTrue(bob.anomaly_flag)
+        self.assertFalse(january.get(employee=self.alice).anomaly_flag)
+
+    def test_generate_payroll_command(self):
+        self.pay(self.alice, date(2025, 12, 1), '3000')
+        out = StringIO()
+
+        call_command('generate_payroll', '2026-01', stdout=out)
+
+        self.assertIn('Created 1 salary record(s) for 2026-01.', out.getvalue())
+        self.assertEqual(self.base_salary(self.alice, JANUARY), Decimal('3000'))
+        with self.assertRaises(CommandError):
+            call_command('generate_payroll', 'January')
@@ -2,12 +2,15 @@ from datetime import date
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LogoutView
+from django.core.paginator import Paginator
+from django.db.models import Count, F, Func, IntegerField, Q, Subquery, Value
+from django.db.models.functions import Greatest
 from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 
-from .ai import attendance_flag, leave_recommendation, payslip_summary
+from .ai import attendance_flag, attendance_flags, leave_recommendation, payslip_summary
 from .forms import (
     AttendanceAdminForm,
     LeaveRequestForm,
@@ -27,12 +30,20 @@ from .models import (
 )
 
 
+PAGE_SIZE = 50
+
+
+def _paginate(request, queryset):
+    return Paginator(queryset, PAGE_SIZE).get_page(request.GET.get('page'))
+
+
 def role_required(roles):
+    elevated_roles = frozenset(roles)
+    if User.ROLE_HR in elevated_roles:
+        elevated_roles |= {User.ROLE_MANAGER}
+
     def decorator(view_func):
         def _wrapped(request, *args, **kwargs):
-            elevated_roles = list(roles)
-            if User.ROLE_HR in roles and User.ROLE_MANAGER not in elevated_roles:
-                elevated_roles.append(User.ROLE_MANAGER)
             if request.user.is_superuser or request.user.role in elevated_roles:
                 return view_func(request, *args, **kwargs)
             return HttpResponseForbidden('Access denied.')
@@ -42,6 +53,13 @@ def role_required(roles):
     return decorator
 
 
+def _ai_cache(request):
+    cache = getattr(request, '_ai_cache', None)
+    if cache is None:
+        cache = request._ai_cache = {}
+    return cache
+
+
 def home(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
@@ -52,24 +70,47 @@ class PostOnlyLogoutView(LogoutView):
     http_method_names = ['post']
 
 
+def _count(queryset):
+    return Subquery(
+        queryset.order_by().annotate(count=Func('pk', function='COUNT')).values('count'),
+        output_field=IntegerField(),
+    )
+
+
+def _counts(user, **querysets):
+    # Anchor the scalar subqueries on the user's own row so every count comes back in one query.
+    counts = {name: _count(queryset) for name, queryset in querysets.items()}
+    return User.objects.filter(pk=user.pk).values(**counts).get()
+
+
+def _dashboard_counts(user):
+    is_admin_role = user.is_superuser or user.is_hr() or user.is_manager()
+    if is_admin_role:
+        leaves = LeaveRequest.objects.filter(status=LeaveRequest.STATUS_PENDING)
+    else:
+        leaves = LeaveRequest.objects.filter(employee=user)
+    if user.is_employee():
+        tasks = Task.objects.filter(assigned_to=user)
+    else:
+        tasks = Task.objects.all()
+    querysets = {'pending_leave_count': leaves, 'task_count': tasks}
+    if is_admin_role:
+        querysets['salary_alerts'] = SalaryRecord.objects.filter(anomaly_flag=True)
+
+    counts = _counts(user, **querysets)
+    counts.setdefault('salary_alerts', 0)
+    return counts
+
+
 @login_required
 def dashboard(request):
     user = request.user
-    is_admin_role = user.is_superuser or user.is_hr() or user.is_manager()
     context = {
         'role': user.role,
-        'attendance_flag': attendance_flag(user) if user.is_employee() else None,
-        'pending_leave_count': LeaveRequest.objects.filter(
-            status=LeaveRequest.STATUS_PENDING
-        ).count()
-        if is_admin_role
-        else LeaveRequest.objects.filter(employee=user).count(),
-        'task_count': Task.objects.filter(assigned_to=user).count()
+        'attendance_flag': attendance_flag(user, cache=_ai_cache(request))
         if user.is_employee()
-        else Task.objects.count(),
-        'salary_alerts': SalaryRecord.objects.filter(anomaly_flag=True).count()
-        if is_admin_role
-        else 0,
+        else None,
+        **_dashboard_counts(user),
     }
     return render(request, 'dashboard.html', context)
 
@@ -126,8 +167,9 @@ def attendance_list(request):
     if request.user.is_hr() or request.user.is_manager():
         records = AttendanceRecord.objects.select_related('employee').all()
     else:
-        records = AttendanceRecord.objects.filter(employee=request.user)
-    return render(request, 'attendance/list.html', {'records': records})
+        records = AttendanceRecord.objects.select_related('employee').filter(employee=request.user)
+    page = _paginate(request, records)
+    return render(request, 'attendance/list.html', {'records': page, 'page': page})
 
 
 @login_required
@@ -141,26 +183,21 @@ def attendance_add(request):
         form = form_class(request.POST, user=request.user)
         if form.is_valid():
             record = form.save(commit=False)
-
-            existing = AttendanceRecord.objects.filter(
-                employee=record.employee, date=record.date
-            ).first()
-            if existing:
-                existing.status = record.status
-                existing.review_status = AttendanceRecord.REVIEW_APPROVED
-                existing.reviewed_by = request.user
-                existing.reviewed_at = timezone.now()
-                existing.submitted_by = request.user
-                existing.save()
+            _, created = AttendanceRecord.objects.update_or_create(
+                employee=record.employee,
+                date=record.date,
+                defaults={
+                    'status': record.status,
+                    'review_status': AttendanceRecord.REVIEW_APPROVED,
+                    'reviewed_by': request.user,
+                    'reviewed_at': timezone.now(),
+                    'submitted_by': request.user,
+                },
+            )
+            if created:
+                messages.success(request, 'Attendance saved.')
+            else:
                 messages.success(request, 'Attendance updated and approved.')
-                return redirect('attendance_list')
-
-            record.review_status = AttendanceRecord.REVIEW_APPROVED
-            record.reviewed_by = request.user
-            record.reviewed_at = timezone.now()
-            record.submitted_by = request.user
-            record.save()
-            messages.success(request, 'Attendance saved.')
             return redirect('attendance_list')
     else:
         form = form_class(user=request.user)
@@ -197,8 +234,10 @@ def leave_list(request):
     if request.user.is_hr() or request.user.is_manager():
         leaves = LeaveRequest.objects.select_related('employee').all()
     else:
-        leaves = LeaveRequest.objects.filter(employee=request.user)
-    return render(request, 'leave/list.html', {'leaves': leaves})
+        leaves = LeaveRequest.objects.select_related('employee').filter(employee=request.user)
+    leaves = leaves.defer('reason')
+    page = _paginate(request, leaves)
+    return render(request, 'leave/list.html', {'leaves': page, 'page': page})
 
 
 @login_required
@@ -226,8 +265,9 @@ def leave_approve(request, pk):
         if action == 'approve':
             leave.status = LeaveRequest.STATUS_APPROVED
             leave.manager = request.user
-            leave.employee.leave_balance = max(leave.employee.leave_balance - leave.total_days, 0)
-            leave.employee.save(update_fields=['leave_balance'])
+            User.objects.filter(pk=leave.employee_id).update(
+                leave_balance=Greatest(F('leave_balance') - leave.total_days, Value(0))
+            )
             messages.success(request, 'Leave approved.')
         elif action == 'reject':
             leave.status = LeaveRequest.STATUS_REJECTED
@@ -243,8 +283,9 @@ def task_list(request):
     if request.user.is_hr() or request.user.is_manager():
         tasks = Task.objects.select_related('assigned_to').all()
     else:
-        tasks = Task.objects.filter(assigned_to=request.user)
-    return render(request, 'tasks/list.html', {'tasks': tasks})
+        tasks = Task.objects.select_related('assigned_to').filter(assigned_to=request.user)
+    page = _paginate(request, tasks)
+    return render(request, 'tasks/list.html', {'tasks': page, 'page': page})
 
 
 @login_required
@@ -266,21 +307,29 @@ def task_add(request):
 @login_required
 @role_required([User.ROLE_HR])
 def report_view(request):
-    employees = User.objects.filter(role=User.ROLE_EMPLOYEE)
+    employees = list(
+        User.objects.filter(role=User.ROLE_EMPLOYEE).annotate(
+            open_tasks=Count('tasks', filter=Q(tasks__status=Task.STATUS_ASSIGNED))
+        )
+    )
+    flags = attendance_flags(employees, cache=_ai_cache(request))
     report_rows = []
     for employee in employees:
         report_rows.append(
             {
                 'employee': employee,
-                'attendance_flag': attendance_flag(employee),
+                'attendance_flag': flags[employee.id],
                 'leave_balance': employee.leave_balance,
-                'open_tasks': Task.objects.filter(assigned_to=employee, status=Task.STATUS_ASSIGNED).count(),
+                'open_tasks': employee.open_tasks,
             }
         )
     context = {
         'report_rows': report_rows,
-        'pending_leaves': LeaveRequest.objects.filter(status=LeaveRequest.STATUS_PENDING).count(),
-        'salary_anomalies': SalaryRecord.objects.filter(anomaly_flag=True).count(),
+        **_counts(
+            request.user,
+            pending_leaves=LeaveRequest.objects.filter(status=LeaveRequest.STATUS_PENDING),
+            salary_anomalies=SalaryRecord.objects.filter(anomaly_flag=True),
+        ),
     }
     return render(request, 'reports/hr.html', context)
 
@@ -289,7 +338,8 @@ def report_view(request):
 @role_required([User.ROLE_HR])
 def salary_list(request):
     records = SalaryRecord.objects.select_related('employee').all()
-    return render(request, 'salary/list.html', {'records': records})
+    page = _paginate(request, records)
+    return render(request, 'salary/list.html', {'records': page, 'page': page})
 
 
 @login_required
@@ -311,8 +361,9 @@ def payslip_list(request):
     if request.user.is_hr() or request.user.is_manager():
         records = SalaryRecord.objects.select_related('employee').all()
     else:
-        records = SalaryRecord.objects.filter(employee=request.user)
-    return render(request, 'salary/payslip_list.html', {'records': records})
+        records = SalaryRecord.objects.select_related('employee').filter(employee=request.user)
+    page = _paginate(request, records)
+    return render(request, 'salary/payslip_list.html', {'records': page, 'page': page})
 
 
 @login_required
@@ -329,7 +380,7 @@ def performance_list(request):
     if request.user.is_hr() or request.user.is_manager():
         ratings = PerformanceRating.objects.select_related('employee').all()
     else:
-        ratings = PerformanceRating.objects.filter(employee=request.user)
+        ratings = PerformanceRating.objects.select_related('employee').filter(employee=request.user)
 
     form = None
     if request.user.is_hr() or request.user.is_manager():
@@ -342,8 +393,9 @@ def performance_list(request):
         else:
             form = PerformanceRatingForm(initial={'month': date.today().replace(day=1)})
 
+    page = _paginate(request, ratings)
     return render(
         request,
         'performance/list.html',
-        {'ratings': ratings, 'form': form},
+        {'ratings': page, 'page': page, 'form': form},
     )